@@ -1,67 +1,59 @@
 from flask import Flask, request
-import threading
-import time
+import atexit
+import fcntl
 import logging
+import os
 import random
+import sys
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
 
-from opentelemetry import trace, metrics
 from opentelemetry.trace import SpanKind, StatusCode
-from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-
-# Tracing
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-
-# Metrics
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
-from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter
-
-# Logging
-from opentelemetry._logs import set_logger_provider, get_logger_provider
-from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler
-from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
-from opentelemetry.exporter.otlp.proto.grpc._log_exporter import OTLPLogExporter
-from opentelemetry.trace import get_current_span
-
-# ----- Resource -----
-resource = Resource(attributes={
-    SERVICE_NAME: "rranjan-flask-app_manual"
-})
-
-# ----- Traces -----
-trace.set_tracer_provider(TracerProvider(resource=resource))
-tracer = trace.get_tracer(__name__)
-trace_exporter = OTLPSpanExporter(endpoint="http://otel-collector:4317", insecure=True)
-trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(trace_exporter))
-
-# ----- Metrics -----
-metrics.set_meter_provider(
-    MeterProvider(
-        resource=resource,
-        metric_readers=[
-            PeriodicExportingMetricReader(
-                OTLPMetricExporter(endpoint="http://otel-collector:4317", insecure=True)
-            )
-        ]
-    )
-)
-meter = metrics.get_meter(__name__)
-request_counter = meter.create_counter(
-    name="http_requests_total",
-    unit="1",
-    description="Total HTTP requests"
-)
-
-# ----- Logging -----
-logger_provider = LoggerProvider(resource=resource)
-set_logger_provider(logger_provider)
-log_exporter = OTLPLogExporter(endpoint="http://otel-collector:4317", insecure=True)
-logger_provider.add_log_record_processor(BatchLogRecordProcessor(log_exporter))
-log_handler = LoggingHandler(level=logging.INFO, logger_provider=logger_provider)
-logging.basicConfig(level=logging.INFO, handlers=[log_handler])
-logger = logging.getLogger("rranjan-logger")
+from opentelemetry._logs import SeverityNumber
+
+import telemetry
+from telemetry import tracer, request_counter, emit_log
+
+# ----- Attribute Keys -----
+K_ENDPOINT = sys.intern("endpoint")
+K_STATUS = sys.intern("custom.status")
+K_JOB = sys.intern("job")
+K_ENV = sys.intern("env")
+K_DB_SYSTEM = sys.intern("db.system")
+K_DB_OPERATION = sys.intern("db.operation")
+K_DB_STATUS = sys.intern("db.status")
+K_SIMULATED_LATENCY_MS = sys.intern("simulated_latency_ms")
+K_TIMEOUT_LATENCY_MS = sys.intern("timeout_latency_ms")
+K_LATENCY_MS = sys.intern("latency_ms")
+K_LATENCY = sys.intern("latency")
+K_LOG_STATUS = sys.intern("status")
+K_ERROR_TYPE = sys.intern("error.type")
+K_ERROR_MESSAGE = sys.intern("error.message")
+K_TASK = sys.intern("task")
+
+# ----- Metric Attributes -----
+ATTR_ROOT = {K_ENDPOINT: "/"}
+ATTR_TO = {K_ENDPOINT: "/timeout"}
+ATTR_BG = {K_ENDPOINT: "/background"}
+
+# ----- Span Attributes -----
+HELLO_ATTRS = {K_ENDPOINT: "/", K_STATUS: "success"}
+ERROR_ATTRS = {K_ENDPOINT: "/error", K_JOB: "failure_simulation", K_ENV: "test"}
+TIMEOUT_ATTRS = {K_ENDPOINT: "/timeout", K_STATUS: "delayed"}
+DB_FAIL_ATTRS = {
+    K_ENDPOINT: "/db-failure",
+    K_DB_SYSTEM: "mysql",
+    K_DB_OPERATION: "SELECT",
+    K_STATUS: "db_error"
+}
+BACKGROUND_ATTRS = {K_JOB: "rranjan_test_task"}
+
+# ----- Log Attributes -----
+DB_FAIL_LOG_ATTRS = {K_DB_SYSTEM: "mysql", K_DB_STATUS: "connection_failed"}
+BACKGROUND_LOG_ATTRS = {K_TASK: "rranjan_background_transaction"}
+
+_rand = random.random
 
 # ----- Flask App -----
 app = Flask(__name__)
@@ -69,97 +61,123 @@ app = Flask(__name__)
 @app.route('/')
 def hello():
     with tracer.start_as_current_span("hello-span", kind=SpanKind.SERVER) as span:
-        span.set_attribute("endpoint", "/")
-        span.set_attribute("custom.status", "success")
-        sleep_time = random.uniform(0.1, 0.3)
+        sleep_time = 0.1 + 0.2 * _rand()
         time.sleep(sleep_time)
-        span.set_attribute("simulated_latency_ms", int(sleep_time * 1000))
-        request_counter.add(1, {"endpoint": "/"})
-        ctx = get_current_span().get_span_context()
-        logger.info("Request handled", extra={
-            "custom_attributes": {
-                "trace_id": ctx.trace_id,
-                "span_id": ctx.span_id,
-                "endpoint": "/",
-                "latency_ms": int(sleep_time * 1000)
-            }
-        })
+        request_counter.add(1, ATTR_ROOT)
+        if span.is_recording():
+            span.set_attributes(HELLO_ATTRS)
+            latency_ms = int(sleep_time * 1000)
+            span.set_attribute(K_SIMULATED_LATENCY_MS, latency_ms)
+            emit_log(span.get_span_context(), SeverityNumber.INFO, "Request handled", {
+                K_ENDPOINT: "/",
+                K_LATENCY_MS: latency_ms
+            })
         return "Hello from Flask with OTEL Traces, Metrics & Logs!"
 
 @app.route('/error')
 def trigger_error():
     with tracer.start_as_current_span("simulate-error", kind=SpanKind.SERVER) as span:
-        span.set_attribute("endpoint", "/error")
-        span.set_attribute("job", "failure_simulation")
-        span.set_attribute("env", "test")
+        if span.is_recording():
+            span.set_attributes(ERROR_ATTRS)
         try:
             1 / 0
         except ZeroDivisionError as e:
-            span.record_exception(e)
-            span.set_status(StatusCode.ERROR, str(e))
-            logger.error("Error route exception", extra={
-                "custom_attributes": {
-                    "trace_id": span.get_span_context().trace_id,
-                    "error.type": "ZeroDivisionError",
-                    "error.message": str(e)
-                }
+            span.set_status(StatusCode.ERROR)
+            if span.is_recording():
+                span.record_exception(e, escaped=False)
+            # Error logs are rare and cheap, so they are kept even for unsampled spans
+            emit_log(span.get_span_context(), SeverityNumber.ERROR, "Error route exception", {
+                K_ERROR_TYPE: "ZeroDivisionError",
+                K_ERROR_MESSAGE: str(e)
             })
             return "Simulated error occurred!", 500
 
 @app.route('/timeout')
 def simulate_timeout():
     with tracer.start_as_current_span("simulate-timeout", kind=SpanKind.SERVER) as span:
-        span.set_attribute("endpoint", "/timeout")
-        span.set_attribute("custom.status", "delayed")
         sleep_time = 5.5
         time.sleep(sleep_time)
-        span.set_attribute("timeout_latency_ms", int(sleep_time * 1000))
-        request_counter.add(1, {"endpoint": "/timeout"})
-        logger.warning("Simulated timeout", extra={
-            "custom_attributes": {
-                "trace_id": span.get_span_context().trace_id,
-                "latency": sleep_time,
-                "status": "delayed"
-            }
-        })
+        request_counter.add(1, ATTR_TO)
+        if span.is_recording():
+            span.set_attributes(TIMEOUT_ATTRS)
+            span.set_attribute(K_TIMEOUT_LATENCY_MS, int(sleep_time * 1000))
+            emit_log(span.get_span_context(), SeverityNumber.WARN, "Simulated timeout", {
+                K_LATENCY: sleep_time,
+                K_LOG_STATUS: "delayed"
+            })
         return "Simulated long request complete"
 
 @app.route('/db-failure')
 def db_failure():
     with tracer.start_as_current_span("simulate-db-failure", kind=SpanKind.SERVER) as span:
-        span.set_attribute("endpoint", "/db-failure")
-        span.set_attribute("db.system", "mysql")
-        span.set_attribute("db.operation", "SELECT")
-        span.set_attribute("custom.status", "db_error")
+        if span.is_recording():
+            span.set_attributes(DB_FAIL_ATTRS)
         try:
             raise ConnectionError("Unable to connect to MySQL database")
         except Exception as e:
-            span.record_exception(e)
-            span.set_status(StatusCode.ERROR, str(e))
-            logger.error("Database error", extra={
-                "custom_attributes": {
-                    "trace_id": span.get_span_context().trace_id,
-                    "db.system": "mysql",
-                    "db.status": "connection_failed"
-                }
-            })
+            span.set_status(StatusCode.ERROR)
+            if span.is_recording():
+                span.record_exception(e, escaped=False)
+            emit_log(span.get_span_context(), SeverityNumber.ERROR, "Database error", DB_FAIL_LOG_ATTRS)
             return "Database connection error simulated", 500
 
-def generate_traces_and_metrics():
-    while True:
-        with tracer.start_as_current_span("rranjan_background_transaction", kind=SpanKind.INTERNAL) as span:
-            span.set_attribute("job", "rranjan_test_task")
-            request_counter.add(1, {"endpoint": "/background"})
-            logger.info("Background transaction running", extra={
-                "custom_attributes": {
-                    "trace_id": span.get_span_context().trace_id,
-                    "span_id": span.get_span_context().span_id,
-                    "task": "rranjan_background_transaction"
-                }
-            })
-            time.sleep(2)
+# ----- Background Jobs -----
+BACKGROUND_LOCK_PATH = os.environ.get("BACKGROUND_JOBS_LOCK", "/tmp/rranjan-background-jobs.lock")
+_background_lock_file = None
+_background_lock_held = False
+_background_lock_warned = False
+
+def _holds_background_lock():
+    # Every gunicorn worker runs the scheduler, but only the process holding
+    # the flock emits; the others retry on each tick, so a new worker takes
+    # over whenever the holder exits (crash, timeout or graceful reload).
+    global _background_lock_file, _background_lock_held, _background_lock_warned
+    if _background_lock_held:
+        return True
+    try:
+        if _background_lock_file is None:
+            _background_lock_file = open(BACKGROUND_LOCK_PATH, "a")
+        fcntl.flock(_background_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    except OSError as e:
+        if not _background_lock_warned:
+            _background_lock_warned = True
+            logging.getLogger("rranjan-logger").warning(
+                "Background jobs disabled, cannot lock %s: %s", BACKGROUND_LOCK_PATH, e
+            )
+        return False
+    _background_lock_held = True
+    return True
 
-threading.Thread(target=generate_traces_and_metrics, daemon=True).start()
+def generate_traces_and_metrics():
+    if not _holds_background_lock():
+        return
+    with tracer.start_as_current_span("rranjan_background_transaction", kind=SpanKind.INTERNAL) as span:
+        request_counter.add(1, ATTR_BG)
+        if span.is_recording():
+            span.set_attributes(BACKGROUND_ATTRS)
+            emit_log(span.get_span_context(), SeverityNumber.INFO, "Background transaction running", BACKGROUND_LOG_ATTRS)
+
+# APScheduler logs every job run at INFO; keep that out of the OTLP log stream
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
+scheduler = BackgroundScheduler(daemon=True)
+scheduler.add_job(generate_traces_and_metrics, "interval", seconds=2)
+
+def start_background_jobs():
+    # Called once per process; under gunicorn every worker starts it (see gunicorn.conf.py)
+    if not scheduler.running:
+        scheduler.start()
+        # Registered after the SDK providers' own exit hooks, so it runs before them
+        atexit.register(stop_background_jobs)
+
+def stop_background_jobs():
+    # Stop the job first (waiting for an in-flight run), then flush and shut
+    # down the tracer, meter and logger providers in that order
+    if scheduler.running:
+        scheduler.shutdown(wait=True)
+    telemetry.shutdown()
 
 if __name__ == '__main__':
+    start_background_jobs()
     app.run(host='0.0.0.0', port=8085)
@@ -0,0 +1,19 @@
+import multiprocessing
+import os
+import sys
+
+bind = "0.0.0.0:8085"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# ----- Background Jobs -----
+def post_worker_init(worker):
+    # Each worker schedules the job; app.py lets only the flock holder emit
+    from app import start_background_jobs
+    start_background_jobs()
+
+def worker_exit(server, worker):
+    app_module = sys.modules.get("app")
+    if app_module is not None:
+        app_module.stop_background_jobs()
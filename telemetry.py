@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+
+from opentelemetry import trace, metrics
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+
+# Tracing
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+# Metrics
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader
+from opentelemetry.exporter.otlp.proto.http.metric_exporter import OTLPMetricExporter
+
+# Logging
+from opentelemetry._logs import set_logger_provider, get_logger_provider
+from opentelemetry.sdk._logs import LoggerProvider, LoggingHandler, LogRecord
+from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+from opentelemetry.exporter.otlp.proto.http._log_exporter import OTLPLogExporter
+
+_logger = logging.getLogger(__name__)
+
+def _env_number(name, default, parse):
+    # Same as the SDK's own env parsing: warn and fall back on malformed values
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        _logger.warning("Invalid value %r for %s, using default %s", value, name, default)
+        return default
+
+def _env_int(name, default):
+    return _env_number(name, default, int)
+
+def _env_float(name, default):
+    return _env_number(name, default, float)
+
+def _configure():
+    # Exporters append /v1/{traces,metrics,logs} to OTEL_EXPORTER_OTLP_ENDPOINT
+    os.environ.setdefault("OTEL_EXPORTER_OTLP_ENDPOINT", "http://otel-collector:4318")
+
+    # ----- Resource -----
+    resource = Resource(attributes={
+        SERVICE_NAME: "rranjan-flask-app_manual"
+    })
+
+    # ----- Traces -----
+    tracer_provider = TracerProvider(
+        resource=resource,
+        sampler=ParentBased(root=TraceIdRatioBased(_env_float("OTEL_TRACES_SAMPLER_ARG", 0.1)))
+    )
+    trace_exporter = OTLPSpanExporter()
+    tracer_provider.add_span_processor(
+        BatchSpanProcessor(
+            trace_exporter,
+            max_queue_size=_env_int("OTEL_BSP_MAX_QUEUE_SIZE", 4096),
+            schedule_delay_millis=_env_int("OTEL_BSP_SCHEDULE_DELAY", 1000),
+            max_export_batch_size=_env_int("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", 256),
+            export_timeout_millis=_env_int("OTEL_BSP_EXPORT_TIMEOUT", 10000),
+        )
+    )
+    trace.set_tracer_provider(tracer_provider)
+
+    # ----- Metrics -----
+    meter_provider = MeterProvider(
+        resource=resource,
+        metric_readers=[
+            PeriodicExportingMetricReader(
+                OTLPMetricExporter()
+            )
+        ]
+    )
+    metrics.set_meter_provider(meter_provider)
+
+    # ----- Logging -----
+    logger_provider = LoggerProvider(resource=resource)
+    log_exporter = OTLPLogExporter()
+    logger_provider.add_log_record_processor(
+        BatchLogRecordProcessor(
+            log_exporter,
+            max_queue_size=_env_int("OTEL_BLRP_MAX_QUEUE_SIZE", 4096),
+            schedule_delay_millis=_env_int("OTEL_BLRP_SCHEDULE_DELAY", 1000),
+            max_export_batch_size=_env_int("OTEL_BLRP_MAX_EXPORT_BATCH_SIZE", 256),
+            export_timeout_millis=_env_int("OTEL_BLRP_EXPORT_TIMEOUT", 10000),
+        )
+    )
+    set_logger_provider(logger_provider)
+    log_handler = LoggingHandler(level=logging.INFO, logger_provider=logger_provider)
+    logging.basicConfig(level=logging.INFO, handlers=[log_handler])
+
+    return tracer_provider, meter_provider, logger_provider, log_handler
+
+# Install the SDK providers only once per process, even if another module
+# (or a second app variant) has already configured them.
+_installed = None
+if isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+    _installed = _configure()
+
+def shutdown():
+    # Flush traces and metrics while the log pipeline can still take their
+    # export warnings, then detach the root handler before closing it.
+    # Repeated shutdown() calls on the SDK providers are no-ops.
+    global _installed
+    if _installed is None:
+        return
+    tracer_provider, meter_provider, logger_provider, log_handler = _installed
+    _installed = None
+    tracer_provider.shutdown()
+    meter_provider.shutdown()
+    logging.getLogger().removeHandler(log_handler)
+    logger_provider.shutdown()
+
+tracer = trace.get_tracer(__name__)
+meter = metrics.get_meter(__name__)
+logger_provider = get_logger_provider()
+otel_logger = logger_provider.get_logger("rranjan-logger")
+# Only the SDK Logger carries a resource; proxy/no-op loggers set up elsewhere do not
+_log_resource = getattr(otel_logger, "resource", None)
+request_counter = meter.create_counter(
+    name="http_requests_total",
+    unit="1",
+    description="Total HTTP requests"
+)
+
+def emit_log(span_context, severity_number, body, attributes):
+    # Emit straight through the OTel Logs API, bypassing std-lib logging
+    otel_logger.emit(LogRecord(
+        timestamp=time.time_ns(),
+        trace_id=span_context.trace_id,
+        span_id=span_context.span_id,
+        trace_flags=span_context.trace_flags,
+        severity_text=severity_number.name,
+        severity_number=severity_number,
+        body=body,
+        resource=_log_resource,
+        attributes=attributes
+    ))